@@ -4,6 +4,9 @@ from flask_cors import CORS
 from supabase import create_client, Client
 from werkzeug.utils import secure_filename
 import uuid
+from datetime import datetime, timezone
+from utils.replica import replica_from_env
+from utils.stats import AggregateCounter, month_of
 
 app = Flask(__name__)
 CORS(app)
@@ -19,6 +22,55 @@ if not SUPABASE_URL or not SUPABASE_KEY:
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# ---------------------------------------------------
+#  LOCAL READ REPLICA (opt-in with REPLICA_SYNC=1)
+# ---------------------------------------------------
+replica = replica_from_env(supabase, app.root_path)
+
+# ---------------------------------------------------
+#  AGGREGATE STATS (rebuilt every 5 minutes)
+# ---------------------------------------------------
+def fetch_columns(table, columns, page_size=1000):
+    """Fetch a few columns of every row, page by page."""
+    rows = []
+    last_id = None
+    while True:
+        query = supabase.table(table).select(columns).order("id")
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        page = query.limit(page_size).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        last_id = page[-1]["id"]
+
+def stats_rows(table, columns):
+    """Rows to rebuild stats from: the local replica when it has the table."""
+    if replica and replica.ready(table):
+        return replica.query(table)
+    return fetch_columns(table, columns)
+
+def event_stats_key(row):
+    return (row.get("category") or "Uncategorized", month_of(row.get("date")))
+
+def sermon_stats_key(row):
+    return (row.get("speaker_or_leader") or "Unknown", month_of(row.get("date")))
+
+event_stats = AggregateCounter(
+    ("category", "month"),
+    lambda: [(row["id"], event_stats_key(row)) for row in stats_rows("events", "id,category,date")]
+)
+sermon_stats = AggregateCounter(
+    ("speaker", "month"),
+    lambda: [(row["id"], sermon_stats_key(row)) for row in stats_rows("sermons", "id,speaker_or_leader,date")]
+)
+STATS = {
+    "events": (event_stats, event_stats_key),
+    "sermons": (sermon_stats, sermon_stats_key),
+}
+event_stats.start()
+sermon_stats.start()
+
 # ---------------------------------------------------
 #  HELPERS
 # ---------------------------------------------------
@@ -51,12 +103,40 @@ def upload_to_bucket(file, bucket="uploads"):
         print("UPLOAD ERROR:", e)
         return None
 
+def now_iso():
+    """UTC timestamp for updated_at; the replica syncs changes by it."""
+    return datetime.now(timezone.utc).isoformat()
+
+def apply_to_replica(table, rows):
+    """Copy rows just written to Supabase into the local replica.
+
+    Never raises: the remote write already succeeded, and the next pull
+    picks the rows up anyway.
+    """
+    if not replica:
+        return
+    try:
+        replica.apply(table, rows)
+    except Exception as e:
+        print("REPLICA APPLY ERROR:", e)
+
+def update_stats(table, rows):
+    """Count rows just written to Supabase; never fails the request."""
+    counter, key = STATS[table]
+    try:
+        for row in rows or []:
+            counter.set(row["id"], key(row))
+    except Exception as e:
+        print("STATS UPDATE ERROR:", e)
+
 # ---------------------------------------------------
 #  SERMONS ROUTES (UNCHANGED)
 # ---------------------------------------------------
 @app.route("/api/sermons", methods=["GET"])
 def get_sermons():
     try:
+        if replica and replica.ready("sermons"):
+            return jsonify(replica.query("sermons")), 200
         data = supabase.table("sermons").select("*").order("created_at", desc=True).execute()
         return jsonify(data.data), 200
     except Exception as e:
@@ -72,9 +152,12 @@ def add_sermon():
             "speaker_or_leader": body.get("preacher") or body.get("speaker_or_leader"),
             "date": body.get("date"),
             "description": body.get("description", ""),
-            "media_url": body.get("url", "")
+            "media_url": body.get("url", ""),
+            "updated_at": now_iso()
         }
         result = supabase.table("sermons").insert(payload).execute()
+        apply_to_replica("sermons", result.data)
+        update_stats("sermons", result.data)
         return jsonify(result.data), 201
     except Exception as e:
         print("ADD SERMON ERROR:", e)
@@ -86,6 +169,8 @@ def add_sermon():
 @app.route("/api/events", methods=["GET"])
 def get_events():
     try:
+        if replica and replica.ready("events"):
+            return jsonify(replica.query("events")), 200
         data = supabase.table("events").select("*").order("created_at", desc=True).execute()
         return jsonify(data.data), 200
     except Exception as e:
@@ -112,10 +197,13 @@ def create_event():
             "time": time_val,
             "location": location,
             "category": category,
-            "image_path": image_path
+            "image_path": image_path,
+            "updated_at": now_iso()
         }
 
         result = supabase.table("events").insert(payload).execute()
+        apply_to_replica("events", result.data)
+        update_stats("events", result.data)
         return jsonify(result.data), 201
     except Exception as e:
         print("EVENT CREATE ERROR:", e)
@@ -139,17 +227,47 @@ def update_event(event_id):
             "time": time_val,
             "location": location,
             "category": category,
+            "updated_at": now_iso(),
         }
 
         if image_file:
             update_data["image_path"] = upload_to_bucket(image_file)
 
         result = supabase.table("events").update(update_data).eq("id", event_id).execute()
+        apply_to_replica("events", result.data)
+        update_stats("events", result.data)
         return jsonify(result.data), 200
     except Exception as e:
         print("EVENT UPDATE ERROR:", e)
         return jsonify({"error": "Failed to update event"}), 500
 
+# ---------------------------------------------------
+#  STATS ROUTES
+# ---------------------------------------------------
+def stats_response(counter):
+    # Until the first rebuild finishes the counts only cover writes seen by
+    # this worker, so don't serve them as if they were complete.
+    if not counter.ready:
+        return jsonify({"error": "Stats are still loading"}), 503
+    return jsonify(counter.snapshot()), 200
+
+@app.route("/api/sermons/stats", methods=["GET"])
+def get_sermon_stats():
+    return stats_response(sermon_stats)
+
+@app.route("/api/events/stats", methods=["GET"])
+def get_event_stats():
+    return stats_response(event_stats)
+
+# ---------------------------------------------------
+#  REPLICA STATUS
+# ---------------------------------------------------
+@app.route("/api/replica/status")
+def replica_status():
+    if not replica:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, "tables": replica.status()}), 200
+
 # ---------------------------------------------------
 #  DEBUG ROUTE
 # ---------------------------------------------------
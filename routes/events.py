@@ -5,6 +5,7 @@ import pytz
 import os
 from werkzeug.utils import secure_filename
 import secrets
+from utils.stats import AggregateCounter, month_of
 
 bp = Blueprint('events', __name__, url_prefix='/api/events')
 
@@ -38,11 +39,29 @@ def get_today():
     tz = pytz.timezone('Africa/Nairobi')
     return datetime.now(tz).date()
 
+def stats_key(event):
+    return (event.category or 'Uncategorized', month_of(event.date))
+
+event_stats = AggregateCounter(
+    ('category', 'month'),
+    lambda: [(row.id, stats_key(row)) for row in db.session.query(Event.id, Event.category, Event.date)]
+)
+
+@bp.record_once
+def start_event_stats(state):
+    event_stats.start(context=state.app.app_context)
+
 @bp.route('', methods=['GET'])
 def get_all_events():
     events = Event.query.all()
     return jsonify([event.to_dict() for event in events])
 
+@bp.route('/stats', methods=['GET'])
+def get_event_stats():
+    if not event_stats.ready:
+        return jsonify({'error': 'stats are still loading'}), 503
+    return jsonify(event_stats.snapshot())
+
 @bp.route('/upcoming', methods=['GET'])
 def get_upcoming_events():
     today = get_today()
@@ -94,11 +113,12 @@ def create_event():
         
         db.session.add(event)
         db.session.commit()
-        
-        return jsonify(event.to_dict()), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    
+    event_stats.set(event.id, stats_key(event))
+    return jsonify(event.to_dict()), 201
 
 @bp.route('/<int:id>', methods=['PUT'])
 def update_event(id):
@@ -143,11 +163,12 @@ def update_event(id):
         
         event.updated_at = datetime.utcnow()
         db.session.commit()
-        
-        return jsonify(event.to_dict())
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    
+    event_stats.set(event.id, stats_key(event))
+    return jsonify(event.to_dict())
 
 @bp.route('/<int:id>', methods=['DELETE'])
 def delete_event(id):
@@ -166,11 +187,12 @@ def delete_event(id):
         
         db.session.delete(event)
         db.session.commit()
-        
-        return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    
+    event_stats.discard(id)
+    return jsonify({'success': True})
 
 @bp.route('/pdf', methods=['GET'])
 def generate_pdf():
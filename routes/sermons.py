@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from models import db, Sermon
 from datetime import datetime
+from utils.stats import AggregateCounter, month_of
 
 bp = Blueprint('sermons', __name__, url_prefix='/api/sermons')
 
@@ -12,11 +13,29 @@ def check_auth():
         return False
     return True
 
+def stats_key(sermon):
+    return (sermon.speaker_or_leader or 'Unknown', month_of(sermon.date))
+
+sermon_stats = AggregateCounter(
+    ('speaker', 'month'),
+    lambda: [(row.id, stats_key(row)) for row in db.session.query(Sermon.id, Sermon.speaker_or_leader, Sermon.date)]
+)
+
+@bp.record_once
+def start_sermon_stats(state):
+    sermon_stats.start(context=state.app.app_context)
+
 @bp.route('', methods=['GET'])
 def get_all_sermons():
     sermons = Sermon.query.order_by(Sermon.date.desc()).all()
     return jsonify([sermon.to_dict() for sermon in sermons])
 
+@bp.route('/stats', methods=['GET'])
+def get_sermon_stats():
+    if not sermon_stats.ready:
+        return jsonify({'error': 'stats are still loading'}), 503
+    return jsonify(sermon_stats.snapshot())
+
 @bp.route('', methods=['POST'])
 def create_sermon():
     if not check_auth():
@@ -46,11 +65,12 @@ def create_sermon():
         
         db.session.add(sermon)
         db.session.commit()
-        
-        return jsonify(sermon.to_dict()), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    
+    sermon_stats.set(sermon.id, stats_key(sermon))
+    return jsonify(sermon.to_dict()), 201
 
 @bp.route('/<int:id>', methods=['PUT'])
 def update_sermon(id):
@@ -72,11 +92,12 @@ def update_sermon(id):
         
         sermon.updated_at = datetime.utcnow()
         db.session.commit()
-        
-        return jsonify(sermon.to_dict())
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    
+    sermon_stats.set(sermon.id, stats_key(sermon))
+    return jsonify(sermon.to_dict())
 
 @bp.route('/<int:id>', methods=['DELETE'])
 def delete_sermon(id):
@@ -88,8 +109,9 @@ def delete_sermon(id):
     try:
         db.session.delete(sermon)
         db.session.commit()
-        
-        return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    
+    sermon_stats.discard(id)
+    return jsonify({'success': True})
@@ -0,0 +1,185 @@
+import time
+
+import pytest
+from flask import Flask, jsonify
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from utils.db_config import configure_database, database_uri, engine_options
+from utils.profiling import _explain, init_profiling, query_budget, record_queries
+
+db = SQLAlchemy()
+
+
+class Item(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50))
+
+
+def create_app(tmp_path, **config):
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'test.db'}",
+        SQL_PROFILING=True,
+        SQL_QUERY_BUDGET=3,
+        **config,
+    )
+    configure_database(app, db)
+    init_profiling(app)
+
+    @app.route('/items')
+    def list_items():
+        return jsonify([item.name for item in Item.query.all()])
+
+    @app.route('/items/one-by-one')
+    def list_items_one_by_one():
+        ids = [item.id for item in Item.query.all()]
+        return jsonify([Item.query.filter_by(id=i).first().name for i in ids])
+
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(tmp_path)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(Item(name=f'item {i}') for i in range(5))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_response_headers_report_queries(client):
+    response = client.get('/items')
+
+    assert response.status_code == 200
+    assert response.headers['X-SQL-Query-Count'] == '1'
+    assert response.headers['X-SQL-Query-Time'].endswith('ms')
+
+
+def test_route_over_budget_fails_under_testing(client):
+    with pytest.raises(AssertionError, match='issued 6 queries, budget is 3'):
+        client.get('/items/one-by-one')
+
+
+def test_query_budget_passes_within_budget(client):
+    with query_budget(1) as recorder:
+        client.get('/items')
+    assert recorder.count == 1
+
+
+def test_query_budget_fails_over_budget(app):
+    with pytest.raises(AssertionError, match='2 queries issued, budget is 1'):
+        with query_budget(1):
+            db.session.execute(text('SELECT 1'))
+            db.session.execute(text('SELECT 2'))
+
+
+def test_summary_flags_duplicates_and_n_plus_one(app):
+    with record_queries() as recorder:
+        db.session.execute(text('SELECT 1'))
+        db.session.execute(text('SELECT 1'))
+        for i in range(1, 4):
+            db.session.execute(text('SELECT name FROM item WHERE id = :id'), {'id': i})
+
+    summary = recorder.summary()
+    assert summary['count'] == 5
+    assert [d['statement'] for d in summary['duplicates']] == ['SELECT 1']
+    assert summary['duplicates'][0]['count'] == 2
+    assert summary['n_plus_one'] == [{'statement': 'SELECT name FROM item WHERE id = ?', 'count': 3}]
+
+
+def test_slow_queries_get_explain_output(app):
+    with record_queries(explain_slow=True, slow_query_ms=0) as recorder:
+        db.session.execute(text('SELECT name FROM item WHERE id = :id'), {'id': 1})
+
+    (slow,) = recorder.summary()['slow']
+    assert any('item' in line for line in slow['explain'])
+
+
+def test_failed_statement_leaves_no_timing_behind(app):
+    with record_queries() as recorder:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                db.session.execute(text('SELECT * FROM missing_table'))
+            db.session.rollback()
+        time.sleep(0.2)
+        db.session.execute(text('SELECT 1'))
+
+    # Had a failed statement's start time been left behind and picked up,
+    # SELECT 1 would be timed from before the sleep.
+    assert [q['statement'] for q in recorder.queries] == ['SELECT 1']
+    assert recorder.queries[0]['duration_ms'] < 100
+
+
+def test_slow_query_threshold_comes_from_app_config(tmp_path, caplog):
+    app = create_app(tmp_path, SQL_SLOW_QUERY_MS=0)
+    with app.app_context():
+        db.create_all()
+        with caplog.at_level('WARNING'):
+            app.test_client().get('/items')
+        db.session.remove()
+        db.drop_all()
+
+    slow = [r.getMessage() for r in caplog.records if r.getMessage().startswith('SQL slow')]
+    assert len(slow) == 1
+    assert 'FROM item' in slow[0]
+
+
+class FakeCursor:
+    def __init__(self, executed):
+        self.executed = executed
+
+    def execute(self, sql, parameters=None):
+        self.executed.append(sql)
+        if sql.startswith('EXPLAIN'):
+            raise RuntimeError('permission denied')
+
+    def close(self):
+        pass
+
+
+def test_failed_explain_is_rolled_back_to_a_savepoint_on_postgres():
+    executed = []
+    conn = type('Conn', (), {})()
+    conn.dialect = type('Dialect', (), {'name': 'postgresql'})()
+    conn.connection = type('DBAPIConnection', (), {'cursor': lambda self: FakeCursor(executed)})()
+
+    plan = _explain(conn, 'SELECT * FROM item', {})
+
+    assert plan == ['EXPLAIN failed: permission denied']
+    assert executed == [
+        'SAVEPOINT sql_profiling_explain',
+        'EXPLAIN SELECT * FROM item',
+        'ROLLBACK TO SAVEPOINT sql_profiling_explain',
+        'RELEASE SAVEPOINT sql_profiling_explain',
+    ]
+
+
+def test_sqlite_pragmas_only_apply_to_the_app_engine(app):
+    assert db.session.execute(text('PRAGMA foreign_keys')).scalar() == 1
+    assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+
+    other = create_engine('sqlite://')
+    with other.connect() as conn:
+        assert conn.execute(text('PRAGMA foreign_keys')).scalar() == 0
+
+
+def test_database_uri_and_engine_options(monkeypatch):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    assert database_uri() == 'sqlite:///database.db'
+
+    monkeypatch.setenv('DATABASE_URL', 'postgres://user:pw@host/db')
+    uri = database_uri()
+    assert uri == 'postgresql://user:pw@host/db'
+    assert engine_options(uri)['pool_pre_ping'] is True
+    assert 'pool_size' not in engine_options('sqlite:///database.db')
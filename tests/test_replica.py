@@ -0,0 +1,240 @@
+import re
+import sqlite3
+
+import pytest
+
+from utils import replica as replica_module
+from utils.replica import SupabaseReplica
+
+
+class StubQuery:
+    """The subset of the PostgREST query builder the replica uses."""
+
+    KEYSET = re.compile(r'(\w+)\.gt\."([^"]*)",and\(\1\.eq\."\2",(\w+)\.gt\.(\w+)\)')
+
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+        self.columns = None
+        self.filters = []
+        self.orders = []
+        self.count = None
+
+    def select(self, columns):
+        if columns != "*":
+            self.columns = columns.split(",")
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append(column)
+        return self
+
+    def _compare(self, column, value, op):
+        self.filters.append(lambda row: row.get(column) is not None and op(row[column], value))
+        return self
+
+    def gt(self, column, value):
+        return self._compare(column, value, lambda a, b: a > b)
+
+    def gte(self, column, value):
+        return self._compare(column, value, lambda a, b: a >= b)
+
+    def is_(self, column, value):
+        assert value == "null"
+        self.filters.append(lambda row: row.get(column) is None)
+        return self
+
+    def or_(self, expression):
+        column, value, tie_column, tie_value = self.KEYSET.fullmatch(expression).groups()
+        tie_value = int(tie_value)
+        self.filters.append(
+            lambda row: row.get(column) is not None and (
+                row[column] > value or (row[column] == value and row[tie_column] > tie_value)
+            )
+        )
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def execute(self):
+        self.client.executed += 1
+        if self.client.on_execute:
+            self.client.on_execute(self.client.executed)
+        rows = [dict(row) for row in self.rows if all(f(row) for f in self.filters)]
+        rows.sort(key=lambda row: [(row.get(c) is None, row.get(c)) for c in self.orders])
+        rows = rows[:self.count]
+        if self.columns:
+            rows = [{c: row.get(c) for c in self.columns} for row in rows]
+        return type("Response", (), {"data": rows})()
+
+
+class StubClient:
+    def __init__(self):
+        self.tables = {"events": [], "sermons": []}
+        self.executed = 0
+        self.on_execute = None
+
+    def table(self, name):
+        return StubQuery(self, self.tables[name])
+
+
+def event(id, updated_at, title=None, **extra):
+    return dict(id=id, title=title or f"Event {id}", date="2025-11-20", created_at=updated_at, updated_at=updated_at, **extra)
+
+
+@pytest.fixture
+def client():
+    return StubClient()
+
+
+@pytest.fixture
+def replica(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(replica_module, "PAGE_SIZE", 2)
+    return SupabaseReplica(client, str(tmp_path / "replica.db"))
+
+
+def test_bulk_load_pages_through_all_rows(client, replica):
+    client.tables["events"] = [event(i, f"2025-01-0{i}T00:00:00") for i in range(1, 6)]
+
+    assert not replica.ready("events")
+    replica.sync()
+
+    assert replica.ready("events")
+    assert [row["id"] for row in replica.query("events")] == [5, 4, 3, 2, 1]
+    assert replica.status()["events"]["watermark"] == "2025-01-05T00:00:00"
+
+
+def test_query_keeps_columns_unknown_to_local_schema(client, replica):
+    client.tables["events"] = [event(1, "2025-01-01T00:00:00", capacity=120, tags=["youth"])]
+    replica.sync()
+
+    assert replica.query("events") == client.tables["events"]
+
+
+def test_incremental_pull_applies_changed_rows(client, replica):
+    client.tables["events"] = [event(1, "2025-01-01T00:00:00"), event(2, "2025-01-02T00:00:00")]
+    replica.sync()
+
+    client.tables["events"][0].update(title="Changed", updated_at="2025-02-01T00:00:00")
+    client.tables["events"].append(event(3, "2025-02-02T00:00:00"))
+    replica.sync()
+
+    rows = {row["id"]: row for row in replica.query("events")}
+    assert rows[1]["title"] == "Changed"
+    assert set(rows) == {1, 2, 3}
+    assert replica.status()["events"]["watermark"] == "2025-02-02T00:00:00"
+
+
+def test_remote_deletes_are_removed_on_reconcile(client, tmp_path):
+    replica = SupabaseReplica(client, str(tmp_path / "replica.db"), reconcile_seconds=0)
+    client.tables["events"] = [event(1, "2025-01-01T00:00:00"), event(2, "2025-01-02T00:00:00")]
+    replica.sync()
+
+    client.tables["events"] = [event(2, "2025-01-02T00:00:00")]
+    replica.sync()
+
+    assert [row["id"] for row in replica.query("events")] == [2]
+
+
+def test_failed_bulk_load_keeps_previous_copy(client, replica, monkeypatch):
+    client.tables["events"] = [event(1, "2025-01-01T00:00:00")]
+    replica.bulk_load("events")
+
+    client.tables["events"] = [event(1, "2025-01-01T00:00:00"), event(2, "2025-01-02T00:00:00")]
+
+    def broken_upsert(conn, table, rows):
+        raise sqlite3.IntegrityError("boom")
+
+    monkeypatch.setattr(replica, "_upsert", broken_upsert)
+    with pytest.raises(sqlite3.IntegrityError):
+        replica.bulk_load("events")
+
+    assert [row["id"] for row in replica.query("events")] == [1]
+    assert replica.status()["events"]["watermark"] == "2025-01-01T00:00:00"
+
+
+def test_status_reports_lag(client, replica):
+    status = replica.status()
+    assert status["events"]["lag_seconds"] is None
+
+    replica.sync()
+    lag = replica.status()["events"]["lag_seconds"]
+    assert lag is not None and 0 <= lag < 5
+
+
+def test_only_one_replica_owns_the_sync(client, tmp_path):
+    if replica_module.fcntl is None:
+        pytest.skip("no fcntl on this platform")
+    path = str(tmp_path / "replica.db")
+    first = SupabaseReplica(client, path)
+    second = SupabaseReplica(client, path)
+
+    assert first._acquire_ownership()
+    assert not second._acquire_ownership()
+
+
+def test_row_changing_between_pages_is_not_skipped(client, replica):
+    client.tables["events"] = [event(i, "2025-01-01T00:00:00") for i in range(1, 4)]
+    replica.sync()
+
+    rows = client.tables["events"]
+    for row in rows:
+        row.update(title="Renamed", updated_at="2025-02-01T00:00:00")
+
+    def move_first_row_to_the_end(executed):
+        # After the first page, row 1 changes again and sorts last. With
+        # offset paging row 3 would shift into the first page and be missed.
+        if executed == 2:
+            rows[0]["updated_at"] = "2025-03-01T00:00:00"
+
+    client.executed = 0
+    client.on_execute = move_first_row_to_the_end
+    replica.sync()
+
+    assert {row["id"]: row["title"] for row in replica.query("events")} == {
+        1: "Renamed", 2: "Renamed", 3: "Renamed",
+    }
+
+
+def test_sync_never_replaces_a_newer_local_row(client, replica):
+    client.tables["events"] = [event(1, "2025-01-01T00:00:00")]
+    replica.sync()
+
+    client.tables["events"][0].update(title="Remote", updated_at="2025-02-01T00:00:00")
+
+    def app_writes_newer_version(executed):
+        # The app updates the row while the pull is fetching the old copy.
+        if client.on_execute:
+            client.on_execute = None
+            replica.apply("events", [event(1, "2025-03-01T00:00:00", title="App")])
+
+    client.on_execute = app_writes_newer_version
+    replica.sync()
+    replica.sync()
+
+    assert replica.query("events")[0]["title"] == "App"
+
+
+def test_bulk_load_keeps_rows_written_after_its_snapshot(client, replica):
+    client.tables["events"] = [event(1, "2025-01-01T00:00:00")]
+
+    def app_creates_row(executed):
+        client.on_execute = None
+        replica.apply("events", [event(2, "2025-02-01T00:00:00")])
+
+    client.on_execute = app_creates_row
+    replica.bulk_load("events")
+
+    assert {row["id"] for row in replica.query("events")} == {1, 2}
+
+
+def test_rows_without_updated_at_are_pulled(client, replica):
+    client.tables["events"] = [event(1, "2025-01-01T00:00:00")]
+    replica.sync()
+
+    client.tables["events"].append(event(2, None))
+    replica.sync()
+
+    assert {row["id"] for row in replica.query("events")} == {1, 2}
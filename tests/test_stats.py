@@ -0,0 +1,124 @@
+import threading
+from datetime import date
+
+from utils.stats import AggregateCounter, month_of
+
+
+def make_counter(rows=()):
+    return AggregateCounter(('category', 'month'), lambda: list(rows))
+
+
+def test_month_of_accepts_dates_and_iso_strings():
+    assert month_of(date(2025, 11, 20)) == '2025-11'
+    assert month_of('2025-11-20') == '2025-11'
+    assert month_of(None) == 'Unknown'
+
+
+def test_snapshot_shape():
+    counter = make_counter()
+    counter.set(1, ('Service', '2025-11'))
+    counter.set(2, ('Service', '2025-12'))
+    counter.set(3, ('Prayer', '2025-11'))
+
+    assert counter.snapshot() == {
+        'total': 3,
+        'reconciled_at': None,
+        'by_category': {'Service': 2, 'Prayer': 1},
+        'by_month': {'2025-11': 2, '2025-12': 1},
+        'groups': [
+            {'category': 'Prayer', 'month': '2025-11', 'count': 1},
+            {'category': 'Service', 'month': '2025-11', 'count': 1},
+            {'category': 'Service', 'month': '2025-12', 'count': 1},
+        ],
+    }
+
+
+def test_set_moves_a_row_between_groups():
+    counter = make_counter()
+    counter.set(1, ('Service', '2025-11'))
+    counter.set(1, ('Outreach', '2025-11'))
+    counter.set(1, ('Outreach', '2025-11'))
+
+    snapshot = counter.snapshot()
+    assert snapshot['total'] == 1
+    assert snapshot['by_category'] == {'Outreach': 1}
+
+
+def test_discard_removes_row_and_ignores_unknown_ids():
+    counter = make_counter()
+    counter.set(1, ('Service', '2025-11'))
+    counter.discard(1)
+    counter.discard(42)
+
+    snapshot = counter.snapshot()
+    assert snapshot['total'] == 0
+    assert snapshot['groups'] == []
+
+
+def test_reconcile_replaces_drifted_counts():
+    counter = make_counter([(1, ('Service', '2025-11')), (2, ('Prayer', '2025-12'))])
+    counter.set(99, ('Stale', '2020-01'))
+    assert not counter.ready
+
+    counter.reconcile()
+
+    assert counter.ready
+
+    snapshot = counter.snapshot()
+    assert snapshot['by_category'] == {'Service': 1, 'Prayer': 1}
+    assert snapshot['reconciled_at'] is not None
+
+
+def test_writes_during_reconcile_are_not_lost():
+    loading = threading.Event()
+    release = threading.Event()
+
+    def slow_load():
+        loading.set()
+        release.wait(5)
+        return [(1, ('Service', '2025-11')), (2, ('Prayer', '2025-11'))]
+
+    counter = AggregateCounter(('category', 'month'), slow_load)
+    thread = threading.Thread(target=counter.reconcile)
+    thread.start()
+    loading.wait(5)
+
+    counter.set(3, ('Outreach', '2025-12'))
+    counter.discard(2)
+    release.set()
+    thread.join()
+
+    assert counter.snapshot()['by_category'] == {'Service': 1, 'Outreach': 1}
+
+
+def test_concurrent_reconcile_runs_once():
+    calls = []
+    loading = threading.Event()
+    release = threading.Event()
+
+    def slow_load():
+        calls.append(1)
+        loading.set()
+        release.wait(5)
+        return []
+
+    counter = AggregateCounter(('category', 'month'), slow_load)
+    thread = threading.Thread(target=counter.reconcile)
+    thread.start()
+    loading.wait(5)
+
+    counter.reconcile()
+    release.set()
+    thread.join()
+
+    assert len(calls) == 1
+
+
+def test_snapshot_never_loads_rows():
+    def load():
+        raise AssertionError('snapshot must not hit the database')
+
+    counter = AggregateCounter(('category', 'month'), load)
+    counter.set(1, ('Service', '2025-11'))
+
+    assert counter.snapshot()['total'] == 1
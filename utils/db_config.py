@@ -0,0 +1,65 @@
+import os
+import sqlite3
+
+from sqlalchemy import event
+
+
+def database_uri():
+    """DATABASE_URL if set (Postgres in production), else the dev SQLite file."""
+    uri = os.getenv('DATABASE_URL')
+    if not uri:
+        # Flask-SQLAlchemy resolves this relative to the instance folder.
+        return 'sqlite:///database.db'
+    # Heroku-style URLs use the scheme SQLAlchemy 1.4+ no longer accepts.
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS tuned for the backend in use."""
+    if uri.startswith('sqlite'):
+        return {
+            'connect_args': {'check_same_thread': False, 'timeout': 15},
+        }
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': 30,
+        # Managed Postgres drops idle connections; recycle before it does and
+        # check each connection on checkout.
+        'pool_recycle': 300,
+        'pool_pre_ping': True,
+        'connect_args': {
+            'connect_timeout': 10,
+            'keepalives': 1,
+            'keepalives_idle': 30,
+            'options': '-c statement_timeout=15000',
+        },
+    }
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run alongside the writer; NORMAL sync is safe with WAL.
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+
+def configure_database(app, db):
+    """Configure the engine for the app and bind the Flask-SQLAlchemy db.
+
+    The SQLite pragmas are registered on this app's engine only, so other
+    engines in the process are left alone.
+    """
+    uri = app.config.setdefault('SQLALCHEMY_DATABASE_URI', database_uri())
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(uri))
+    app.config.setdefault('SQLALCHEMY_TRACK_MODIFICATIONS', False)
+    db.init_app(app)
+    if uri.startswith('sqlite'):
+        with app.app_context():
+            event.listen(db.engine, 'connect', _sqlite_pragmas)
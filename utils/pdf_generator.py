@@ -43,8 +43,10 @@ def generate_events_pdf():
     elements.append(Spacer(1, 0.3*inch))
     
     today = get_today()
-    upcoming_events = Event.query.filter(Event.date >= today).order_by(Event.date.asc()).all()
-    past_events = Event.query.filter(Event.date < today).order_by(Event.date.desc()).all()
+    # One scan instead of separate upcoming/past queries.
+    events = Event.query.order_by(Event.date.asc()).all()
+    upcoming_events = [event for event in events if event.date >= today]
+    past_events = [event for event in reversed(events) if event.date < today]
     
     elements.append(Paragraph("Upcoming Events", heading_style))
     elements.append(Spacer(1, 0.2*inch))
@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_SLOW_QUERY_MS = 50
+N_PLUS_ONE_THRESHOLD = 3
+
+_local = threading.local()
+_listeners_installed = False
+
+
+class QueryRecorder:
+    """Collects every statement run on this thread while it is active."""
+
+    def __init__(self, explain_slow=False, slow_query_ms=DEFAULT_SLOW_QUERY_MS):
+        self.queries = []
+        self.explain_slow = explain_slow
+        self.slow_query_ms = slow_query_ms
+
+    def record(self, statement, parameters, duration, explain=None):
+        self.queries.append({
+            'statement': statement,
+            'parameters': parameters,
+            'duration_ms': duration * 1000,
+            'explain': explain,
+        })
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_ms(self):
+        return sum(q['duration_ms'] for q in self.queries)
+
+    def summary(self):
+        """Count, total time, duplicates, likely N+1 patterns and slow queries."""
+        exact = Counter((q['statement'], repr(q['parameters'])) for q in self.queries)
+        by_statement = Counter(q['statement'] for q in self.queries)
+
+        duplicates = [
+            {'statement': stmt, 'parameters': params, 'count': n}
+            for (stmt, params), n in exact.items() if n > 1
+        ]
+        # Same SQL, different parameters, many times: a loop issuing one
+        # query per item instead of a single IN/JOIN.
+        variants = Counter(stmt for stmt, _ in exact)
+        n_plus_one = [
+            {'statement': stmt, 'count': n}
+            for stmt, n in by_statement.items()
+            if n >= N_PLUS_ONE_THRESHOLD and variants[stmt] > 1
+        ]
+        slow = [q for q in self.queries if q['duration_ms'] >= self.slow_query_ms]
+
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'duplicates': duplicates,
+            'n_plus_one': n_plus_one,
+            'slow': slow,
+        }
+
+
+def _active_recorders():
+    if not hasattr(_local, 'recorders'):
+        _local.recorders = []
+    return _local.recorders
+
+
+def _explain(conn, statement, parameters):
+    if not statement.lstrip().upper().startswith('SELECT'):
+        return None
+    sqlite = conn.dialect.name == 'sqlite'
+    prefix = 'EXPLAIN QUERY PLAN ' if sqlite else 'EXPLAIN '
+    # Run on the raw DBAPI cursor so the EXPLAIN itself is not recorded. It
+    # shares the request's transaction, so elsewhere (Postgres) it runs in a
+    # savepoint: a failed EXPLAIN must not abort the request's transaction.
+    cursor = conn.connection.cursor()
+    try:
+        if not sqlite:
+            cursor.execute('SAVEPOINT sql_profiling_explain')
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = [' '.join(str(col) for col in row) for row in cursor.fetchall()]
+        except Exception as e:
+            if not sqlite:
+                cursor.execute('ROLLBACK TO SAVEPOINT sql_profiling_explain')
+            plan = [f'EXPLAIN failed: {e}']
+        if not sqlite:
+            cursor.execute('RELEASE SAVEPOINT sql_profiling_explain')
+        return plan
+    except Exception as e:
+        return [f'EXPLAIN skipped: {e}']
+    finally:
+        cursor.close()
+
+
+# The start time lives on the execution context, which is discarded with the
+# statement, so statements that raise leave nothing behind on the pooled
+# connection.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _active_recorders():
+        context._profiling_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    recorders = _active_recorders()
+    start = getattr(context, '_profiling_start', None)
+    if not recorders or start is None:
+        return
+    duration = time.perf_counter() - start
+    explain = None
+    if not executemany and any(
+        r.explain_slow and duration * 1000 >= r.slow_query_ms for r in recorders
+    ):
+        explain = _explain(conn, statement, parameters)
+    for recorder in recorders:
+        recorder.record(statement, parameters, duration, explain)
+
+
+def install_listeners():
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    _listeners_installed = True
+
+
+@contextmanager
+def record_queries(explain_slow=False, slow_query_ms=DEFAULT_SLOW_QUERY_MS):
+    """Record the statements executed inside the block."""
+    install_listeners()
+    recorder = QueryRecorder(explain_slow=explain_slow, slow_query_ms=slow_query_ms)
+    recorders = _active_recorders()
+    recorders.append(recorder)
+    try:
+        yield recorder
+    finally:
+        recorders.remove(recorder)
+
+
+@contextmanager
+def query_budget(max_queries):
+    """Fail with AssertionError if the block issues more than max_queries.
+
+    Meant for tests, e.g.::
+
+        with query_budget(1):
+            client.get('/api/events')
+    """
+    with record_queries() as recorder:
+        yield recorder
+    if recorder.count > max_queries:
+        statements = '\n'.join(q['statement'] for q in recorder.queries)
+        raise AssertionError(
+            f'{recorder.count} queries issued, budget is {max_queries}:\n{statements}'
+        )
+
+
+def init_profiling(app):
+    """Record SQL per request when SQL_PROFILING is set in config or env.
+
+    Each response gets X-SQL-Query-Count and X-SQL-Query-Time headers and a
+    summary is logged. Statements slower than SQL_SLOW_QUERY_MS (config or
+    env, default 50) are logged with their EXPLAIN output. If
+    SQL_QUERY_BUDGET is set, requests over budget are logged as errors, or
+    raise under app.testing.
+    """
+    enabled = app.config.get('SQL_PROFILING', os.getenv('SQL_PROFILING', '').lower() in ('1', 'true', 'yes'))
+    if not enabled:
+        return
+    install_listeners()
+    budget = app.config.get('SQL_QUERY_BUDGET')
+    slow_query_ms = float(app.config.get('SQL_SLOW_QUERY_MS', os.getenv('SQL_SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS)))
+
+    @app.before_request
+    def start_recording():
+        g.sql_recorder = QueryRecorder(explain_slow=True, slow_query_ms=slow_query_ms)
+        _active_recorders().append(g.sql_recorder)
+
+    @app.after_request
+    def report_queries(response):
+        recorder = g.pop('sql_recorder', None)
+        if recorder is None:
+            return response
+        _active_recorders().remove(recorder)
+
+        summary = recorder.summary()
+        response.headers['X-SQL-Query-Count'] = str(summary['count'])
+        response.headers['X-SQL-Query-Time'] = f"{summary['total_ms']:.3f}ms"
+
+        app.logger.info('SQL %s %s: %d queries in %.3fms', request.method, request.path, summary['count'], summary['total_ms'])
+        for dup in summary['duplicates']:
+            app.logger.warning('SQL duplicate (x%d): %s', dup['count'], dup['statement'])
+        for pattern in summary['n_plus_one']:
+            app.logger.warning('SQL possible N+1 (x%d): %s', pattern['count'], pattern['statement'])
+        for slow in summary['slow']:
+            app.logger.warning('SQL slow (%.3fms): %s\n%s', slow['duration_ms'], slow['statement'], '\n'.join(slow['explain'] or []))
+
+        if budget is not None and summary['count'] > budget:
+            message = f"{request.method} {request.path} issued {summary['count']} queries, budget is {budget}"
+            if app.testing:
+                raise AssertionError(message)
+            app.logger.error(message)
+        return response
+
+    @app.teardown_request
+    def stop_recording(exc):
+        # after_request is skipped when the view raises.
+        recorder = g.pop('sql_recorder', None)
+        if recorder is not None and recorder in _active_recorders():
+            _active_recorders().remove(recorder)
@@ -0,0 +1,332 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single process, no lock needed
+    fcntl = None
+
+PAGE_SIZE = 1000
+ORDER_COLUMNS = ("id", "created_at", "updated_at")
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+class SupabaseReplica:
+    """Mirror Supabase tables into a local SQLite file.
+
+    Each row is stored as the JSON Supabase returned, so reads have exactly
+    the same shape as the remote API. The first sync for a table bulk loads
+    every row; later syncs only pull rows whose ``updated_at`` is at or
+    after the last seen value, and every ``reconcile_seconds`` the local ids
+    are compared with the remote ones to drop rows deleted in Supabase.
+
+    Only one process syncs at a time: the sync loop takes an exclusive lock
+    on ``<db_path>.lock``, so gunicorn workers share one writer and the
+    others just read.
+    """
+
+    def __init__(self, client, db_path, tables=("sermons", "events"), reconcile_seconds=300):
+        self.client = client
+        self.db_path = db_path
+        self.tables = tuple(tables)
+        self.reconcile_seconds = reconcile_seconds
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=15)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Everything inside is committed together or not at all."""
+        with self._lock, self._connect() as conn:
+            with conn:
+                yield conn
+
+    def _init_schema(self):
+        with self._transaction() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS replica_state ("
+                "table_name VARCHAR(100) PRIMARY KEY, "
+                "watermark VARCHAR(64), "
+                "synced_at VARCHAR(64), "
+                "reconciled_at VARCHAR(64))"
+            )
+            for table in self.tables:
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    "id PRIMARY KEY, "
+                    "created_at VARCHAR(64), "
+                    "updated_at VARCHAR(64), "
+                    "data TEXT NOT NULL)"
+                )
+
+    def _check_table(self, table):
+        if table not in self.tables:
+            raise ValueError(f"Table '{table}' is not replicated")
+
+    def _get_state(self, table):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT * FROM replica_state WHERE table_name = ?", (table,)
+            ).fetchone()
+
+    # ---------------------------------------------------
+    #  READS
+    # ---------------------------------------------------
+    def ready(self, table):
+        """True once the table has been loaded at least once."""
+        self._check_table(table)
+        return self._get_state(table) is not None
+
+    def query(self, table, order_by="created_at", desc=True):
+        """Return all rows of a replicated table, as Supabase returned them."""
+        self._check_table(table)
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f"Cannot order by '{order_by}'")
+        direction = "DESC" if desc else "ASC"
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT data FROM {table} ORDER BY {order_by} {direction}").fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def status(self):
+        """Return the watermark and replication lag (seconds) per table."""
+        now = utc_now()
+        with self._connect() as conn:
+            state = {
+                row["table_name"]: row
+                for row in conn.execute("SELECT * FROM replica_state")
+            }
+        result = {}
+        for table in self.tables:
+            row = state.get(table)
+            synced_at = row["synced_at"] if row else None
+            lag = None
+            if synced_at:
+                lag = (now - datetime.fromisoformat(synced_at)).total_seconds()
+            result[table] = {
+                "watermark": row["watermark"] if row else None,
+                "synced_at": synced_at,
+                "reconciled_at": row["reconciled_at"] if row else None,
+                "lag_seconds": lag,
+            }
+        return result
+
+    # ---------------------------------------------------
+    #  WRITES
+    # ---------------------------------------------------
+    def _upsert(self, conn, table, rows):
+        rows = [row for row in rows or [] if row.get("id") is not None]
+        # Only move a row forward: a fetched copy that is older than what an
+        # apply() already wrote (or one without updated_at) must not win.
+        conn.executemany(
+            f"INSERT INTO {table} (id, created_at, updated_at, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET "
+            "created_at = excluded.created_at, updated_at = excluded.updated_at, data = excluded.data "
+            f"WHERE {table}.updated_at IS NULL OR excluded.updated_at >= {table}.updated_at",
+            [
+                (row["id"], row.get("created_at"), row.get("updated_at"), json.dumps(row, default=str))
+                for row in rows
+            ],
+        )
+        return len(rows)
+
+    def _delete_missing(self, conn, table, remote_ids, watermark):
+        """Delete local rows absent from a remote snapshot.
+
+        Rows newer than the snapshot's watermark were written after it was
+        taken (e.g. by apply()), so they are kept until a later check.
+        """
+        deleted = [
+            row["id"] for row in conn.execute(f"SELECT id, updated_at FROM {table}")
+            if row["id"] not in remote_ids
+            and (watermark is None or row["updated_at"] is None or row["updated_at"] <= watermark)
+        ]
+        conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(i,) for i in deleted])
+        return len(deleted)
+
+    def apply(self, table, rows):
+        """Upsert rows (as returned by Supabase) into the local copy."""
+        self._check_table(table)
+        with self._transaction() as conn:
+            return self._upsert(conn, table, rows)
+
+    # ---------------------------------------------------
+    #  SYNC
+    # ---------------------------------------------------
+    def _fetch_pages(self, build_query, by_updated_at=False):
+        """Fetch every row of build_query() with keyset paging.
+
+        Pages continue after the last (id) or (updated_at, id) seen rather
+        than at an offset, so rows changing between requests cannot shift
+        another row past a page boundary.
+        """
+        rows = []
+        last = None
+        while True:
+            query = build_query()
+            if by_updated_at:
+                query = query.order("updated_at").order("id")
+                if last:
+                    updated_at = last["updated_at"]
+                    query = query.or_(
+                        f'updated_at.gt."{updated_at}",'
+                        f'and(updated_at.eq."{updated_at}",id.gt.{last["id"]})'
+                    )
+            else:
+                query = query.order("id")
+                if last:
+                    query = query.gt("id", last["id"])
+            page = query.limit(PAGE_SIZE).execute().data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            last = page[-1]
+
+    def bulk_load(self, table):
+        """Bring the local copy in line with a full remote snapshot."""
+        self._check_table(table)
+        rows = self._fetch_pages(lambda: self.client.table(table).select("*"))
+        watermark = max((r["updated_at"] for r in rows if r.get("updated_at")), default=None)
+        now = utc_now().isoformat()
+        # Upserts, deletes and state update share one transaction: a failed
+        # load leaves the previous copy and watermark untouched.
+        with self._transaction() as conn:
+            self._upsert(conn, table, rows)
+            self._delete_missing(conn, table, {row["id"] for row in rows}, watermark)
+            conn.execute(
+                "INSERT OR REPLACE INTO replica_state (table_name, watermark, synced_at, reconciled_at) "
+                "VALUES (?, ?, ?, ?)",
+                (table, watermark, now, now),
+            )
+        return len(rows)
+
+    def reconcile(self, table):
+        """Drop local rows whose id no longer exists in Supabase."""
+        self._check_table(table)
+        watermark = self._get_state(table)["watermark"]
+        remote_ids = {
+            row["id"] for row in self._fetch_pages(lambda: self.client.table(table).select("id"))
+        }
+        with self._transaction() as conn:
+            deleted = self._delete_missing(conn, table, remote_ids, watermark)
+            conn.execute(
+                "UPDATE replica_state SET reconciled_at = ? WHERE table_name = ?",
+                (utc_now().isoformat(), table),
+            )
+        return deleted
+
+    def _reconcile_due(self, state):
+        if not state["reconciled_at"]:
+            return True
+        age = (utc_now() - datetime.fromisoformat(state["reconciled_at"])).total_seconds()
+        return age >= self.reconcile_seconds
+
+    def pull(self, table):
+        """Pull rows changed since the last sync; bulk load on first run."""
+        self._check_table(table)
+        state = self._get_state(table)
+        # No watermark means no remote row had updated_at; only a full
+        # reload can pick up changes then.
+        if state is None or state["watermark"] is None:
+            return self.bulk_load(table)
+        if self._reconcile_due(state):
+            self.reconcile(table)
+        watermark = state["watermark"]
+        # gte rather than gt so rows sharing the watermark timestamp are not
+        # missed; re-applying a row is harmless.
+        rows = self._fetch_pages(
+            lambda: self.client.table(table).select("*").gte("updated_at", watermark),
+            by_updated_at=True,
+        )
+        watermark = max([watermark] + [r["updated_at"] for r in rows if r.get("updated_at")])
+        # A watermark can never match rows without updated_at, so those are
+        # fetched on every pull.
+        rows += self._fetch_pages(
+            lambda: self.client.table(table).select("*").is_("updated_at", "null")
+        )
+        with self._transaction() as conn:
+            self._upsert(conn, table, rows)
+            conn.execute(
+                "UPDATE replica_state SET watermark = ?, synced_at = ? WHERE table_name = ?",
+                (watermark, utc_now().isoformat(), table),
+            )
+        return len(rows)
+
+    def sync(self):
+        for table in self.tables:
+            try:
+                self.pull(table)
+            except Exception as e:
+                print(f"REPLICA SYNC ERROR ({table}):", e)
+
+    def _acquire_ownership(self):
+        """Take the cross-process sync lock; kept until the process exits."""
+        if self._lock_file is not None or fcntl is None:
+            return True
+        lock_file = open(self.db_path + ".lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def start(self, interval=30):
+        """Sync every `interval` seconds in a background thread.
+
+        Every process runs the loop, but only the one holding the lock file
+        syncs; if it dies another worker takes over on its next tick.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        def loop():
+            while not self._stop.is_set():
+                if self._acquire_ownership():
+                    self.sync()
+                self._stop.wait(interval)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="supabase-replica", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+def replica_from_env(client, root_path):
+    """Build and start a replica when REPLICA_SYNC is enabled, else None.
+
+    GETs keep going to Supabase until the first sync has loaded a table.
+    """
+    if os.getenv("REPLICA_SYNC", "").lower() not in ("1", "true", "yes"):
+        return None
+    db_path = os.getenv("REPLICA_DB_PATH") or os.path.join(root_path, "instance", "replica.db")
+    replica = SupabaseReplica(
+        client,
+        db_path,
+        reconcile_seconds=int(os.getenv("REPLICA_RECONCILE_INTERVAL", "300")),
+    )
+    replica.start(interval=int(os.getenv("REPLICA_SYNC_INTERVAL", "30")))
+    return replica
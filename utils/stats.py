@@ -0,0 +1,142 @@
+import threading
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+
+def month_of(value):
+    """'YYYY-MM' for a date or an ISO date string."""
+    return str(value)[:7] if value else 'Unknown'
+
+
+class AggregateCounter:
+    """In-memory group counts kept up to date by the write handlers.
+
+    Each row id maps to a key tuple of ``fields`` values. Create/update/delete
+    handlers call set/discard after the write succeeds, so reads only touch
+    the per-group counts, never the table. A background thread rebuilds
+    everything from ``load_rows`` (an iterable of ``(id, key)`` pairs) every
+    ``reconcile_seconds`` to correct drift, e.g. between gunicorn workers.
+    Writes that land while a rebuild is loading are replayed on top of it.
+    """
+
+    def __init__(self, fields, load_rows, reconcile_seconds=300):
+        self.fields = tuple(fields)
+        self.load_rows = load_rows
+        self.reconcile_seconds = reconcile_seconds
+        self.reconciled_at = None
+        self._keys = {}
+        self._counts = Counter()
+        self._pending = None
+        self._lock = threading.Lock()
+        self._reconcile_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def ready(self):
+        """True once the counts have been rebuilt from the database."""
+        return self.reconciled_at is not None
+
+    def _set(self, row_id, key):
+        old = self._keys.get(row_id)
+        if old is not None:
+            self._decrement(old)
+        self._keys[row_id] = key
+        self._counts[key] += 1
+
+    def _discard(self, row_id):
+        old = self._keys.pop(row_id, None)
+        if old is not None:
+            self._decrement(old)
+
+    def _decrement(self, key):
+        self._counts[key] -= 1
+        if self._counts[key] <= 0:
+            del self._counts[key]
+
+    def set(self, row_id, key):
+        """Record that row_id now belongs to group key (insert or update)."""
+        with self._lock:
+            self._set(row_id, key)
+            if self._pending is not None:
+                self._pending.append(('set', row_id, key))
+
+    def discard(self, row_id):
+        with self._lock:
+            self._discard(row_id)
+            if self._pending is not None:
+                self._pending.append(('discard', row_id, None))
+
+    def reconcile(self):
+        """Rebuild the counts from the database; no-op if one is running."""
+        if not self._reconcile_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                self._pending = []
+            try:
+                keys = dict(self.load_rows())
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                for op, row_id, key in self._pending:
+                    if op == 'set':
+                        keys[row_id] = key
+                    else:
+                        keys.pop(row_id, None)
+                self._keys = keys
+                self._counts = Counter(keys.values())
+                self._pending = None
+                self.reconciled_at = datetime.now(timezone.utc).isoformat()
+        finally:
+            self._reconcile_lock.release()
+
+    def start(self, context=None):
+        """Reconcile now and then every reconcile_seconds in the background.
+
+        ``context`` is a callable returning a context manager to run each
+        rebuild in, e.g. ``app.app_context`` for Flask-SQLAlchemy loaders.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    with (context() if context else nullcontext()):
+                        self.reconcile()
+                except Exception as e:
+                    print('STATS RECONCILE ERROR:', e)
+                self._stop.wait(self.reconcile_seconds)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name='stats-reconcile', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def snapshot(self):
+        """Totals, per-field rollups and per-group counts.
+
+        Cost depends on the number of groups, not the number of rows.
+        """
+        with self._lock:
+            counts = dict(self._counts)
+            reconciled_at = self.reconciled_at
+
+        result = {'total': sum(counts.values()), 'reconciled_at': reconciled_at}
+        for i, field in enumerate(self.fields):
+            rollup = Counter()
+            for key, n in counts.items():
+                rollup[key[i]] += n
+            result[f'by_{field}'] = dict(rollup)
+        result['groups'] = [
+            dict(zip(self.fields, key), count=n) for key, n in sorted(counts.items())
+        ]
+        return result